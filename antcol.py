@@ -11,101 +11,107 @@ __maintainer__ = "Miguel Concha"
 __email__ = "mconcha@ciencias.unam.mx"
 __status__ = "Completo"
 
-from utils import *                   # Funciones auxiliares y clases necesarias para el modelado.
 import numpy as np 			          # Manipulación de matrices.
-import networkx as nx 				  # Gráficas.
-import matplotlib.pyplot as plt       # Dibujar las gráficas.
-import tableprint as tp 			  # Propósitos estéticos.
-from random import uniform            # Generación de números aleatorios.
+from random import randint, uniform   # Generación de números aleatorios.
+import time                           # Presupuesto de tiempo de ejecución.
+# Funciones auxiliares y clases necesarias para el modelado. El núcleo sólo depende
+# de NumPy: networkx, matplotlib y tableprint se cargan únicamente cuando se usan.
+from utils import (ColorClass, select_with_probability, union_lists, difference_lists,
+                   get_color_class)
 
-def tau_ik(i, k, list_color_classes, t):
+# Tipos admitidos para la matriz de rastros.
+TRAIL_DTYPES = (np.dtype(np.float64), np.dtype(np.float32), np.dtype(np.uint16))
+# Número de entradas por bloque en la actualización de la matriz de rastros (cabe en caché).
+_BLOCK_ENTRIES = 1 << 14
+
+def adjacency_matrix(G, out=None):
 	"""
-	Función para el cálculo de τik del artículo.
-	Se refiere al restro ("trail") asociado a colorear el vértoce i
-	del color k. Esto depende de los vértices ya coloreados de color k:
-	el conjunto Vk.
-
-	:param i: El vértice cuyo rastro será estimado.
-	:param k: El color del que habría de colorearse i para el cálculo.
-	:param list_color_classes: La lista de clases de colores.
-	:param t: La matriz de rastros.
-	:return: El rastro asociado de colorear el vértice i de color k.
-	:retype: double64.
+	Matriz de adyacencia booleana de G, para evaluar la visibilidad de muchos
+	vértices a la vez. Los vértices deben ser 0, ..., |V| - 1, igual que en
+	la matriz de rastros.
+
+	:param G: networkx.Graph
+	:param out: Matriz booleana opcional de |V|×|V| ya reservada que se reutiliza.
+	:return: La matriz de |V|×|V| con verdadero donde hay arista.
+	:rtype: numpy array.
 	"""
-	# Se obtiene la clase de color asociado al color k.
-	V_k = get_color_class(list_color_classes, k)
-	# Viendo el número de vértices en la clase
-	length = len(V_k.vertices)
-	# Se calcula de acuerdo a la fórmula del artículo.
-	summation = 0
-	# Recorremos la matriz de rastros.
-	for i, row in enumerate(t):
-		for j, entry in enumerate(row):
-			# Si el vértice está en la clase de color, consideramos su rastro.
-			if j in V_k.vertices:
-				summation += t[i][j]
-	return summation / length
-
-def P_ik(G, list_color_classes, i, k, alpha, beta, t):
+	n = len(G)
+	if out is None:
+		A = np.zeros((n,n), dtype=bool)
+	else:
+		if out.shape != (n, n) or out.dtype != bool:
+			raise ValueError("La matriz de adyacencia debe ser booleana de %dx%d." % (n, n))
+		A = out
+		A.fill(False)
+	for u, v in G.edges:
+		A[u, v] = A[v, u] = True
+	return A
+
+def tau_k(t, candidates, V_k):
 	"""
-	Función que estima la probabilidad para escoger colorear al vértice
-	i del color actual k.
+	Función para el cálculo de τik del artículo para todos los candidatos i
+	a la vez. Se refiere al restro ("trail") asociado a colorear el vértice i
+	del color k: el promedio de t[i][j] sobre los vértices j ya coloreados
+	de color k (el conjunto Vk).
 
-	:param G: networkx.Graph
-	:param list_color_classes: La lista de clases de color.
-	:param i: El vértice para el que se calculará la probabilidad.
-	:param k: La etiqueta del color actual.
-	:params alpha beta: Los metaparámetros del ACO.
 	:param t: La matriz de rastros.
-	:return: La probabilidad de escoger pintar a i del color k.
-	:rtype: double64.
+	:param candidates: Arreglo con los vértices cuyo rastro será estimado.
+	:param V_k: Arreglo con los vértices de la clase de color k (no vacía).
+	:return: El rastro asociado de colorear cada candidato de color k
+	         (escalado por el factor de trail_scale si t es entera).
+	:rtype: numpy array.
 	"""
-	# Obtenemos la clase de color correspondiente a k
-	color_class = get_color_class(list_color_classes, k)
-	# A partir de la clase de color, determinando los vértices que puedes
-	# ser todavía agregados a ésta.
-	w = W(G, color_class)
-	if w: 
-		if i in w:
-			# Calculando los facotres dle numerador de la fórmula (rastro asociado, visibilidad).
-			factor_1 = tau_ik(i, k, list_color_classes, t)**alpha
-			factor_2 = n_ik(G, list_color_classes, i, k)**beta
-			numerator = factor_1 * factor_2
-			# Para el denominador, llamamos a otra función auxiliar.
-			denominator = _denominator(G, list_color_classes, w, k, alpha, beta, t)
-			return numerator / denominator
-		# Si es vacía o bien el vértice i no está en w, la probabilidad se define como cero.
-		return 0 
-	return 0
-
-def n_ik(G, list_color_classes, i, k):
+	# Se acumula en double para que las matrices de menor precisión no se
+	# desborden ni pierdan precisión.
+	return t[np.ix_(candidates, V_k)].sum(axis=1, dtype=np.float64) / len(V_k)
+
+def n_k(adjacency, candidates, B, rule):
 	"""
-	La visibilidad de colorear al vértice i del color actual k
+	La visibilidad de colorear a cada candidato del color actual k, que
 	puede definirse por tres reglas distintas como se menciona en el artículo.
-	Menciona también que elegir la regla de forma aleatoria se demostró ser mejor. 
-	Así es como lo hago.
+	Los candidatos forman el conjunto W de vértices que aún pueden agregarse
+	a la clase de color; B son los vértices sin color que ya no pueden.
 
-	:param G: networkx.Graph
-	:param list_color_classes: La lista de clases de color.
-	:param i: El vértice para el que se calculará la visibilidad.
-	:param k: El color del que habría de pintarse i en el cálculo.
-	:return: La visibilidad de pintar al vértice i del color actual k.
-	:rtype: double64.
+	:param adjacency: La matriz de adyacencia booleana (véase adjacency_matrix).
+	:param candidates: Arreglo con los vértices de W.
+	:param B: Arreglo con los vértices de B.
+	:param rule: La regla de visibilidad (1, 2 o 3).
+	:return: La visibilidad de cada candidato.
+	:rtype: numpy array.
 	"""
-	# Eligiendo aleatoriamente la regla de visibilidad de usar.
-	random_choice = randint(1,3)
-	# Obteniendo la clase de color para el color k.
-	C_k = get_color_class(list_color_classes, k)
-	# Obteniendo los vértices que pueden y no pueden agregarse a la clase de color.
-	W = W(G, C_k)
-	B =  B(G, C_k)
-	# Dependiendo de la regla, de aplica la fórmula mencionada en el artículo.
-	if random_choice == 1:
-		return degree_in_subgraph(G, B, i)
-	elif random_choice == 2:
-		return len(W) - degree_in_subgraph(G, W, i)
-	else:
-		return degree_in_subgraph(G, union_lists(B, W), i)
+	# Grados de cada candidato hacia B y hacia W.
+	rows = adjacency[candidates]
+	degree_B = rows[:, B].sum(axis=1)
+	if rule == 1:
+		return degree_B.astype(np.float64)
+	degree_W = rows[:, candidates].sum(axis=1)
+	if rule == 2:
+		return (len(candidates) - degree_W).astype(np.float64)
+	return (degree_B + degree_W).astype(np.float64)
+
+def P_k(t, adjacency, candidates, V_k, B, alpha, beta, rule):
+	"""
+	Función que estima, en un solo paso, la distribución de probabilidad para
+	escoger qué candidato colorear del color actual k: τik^α·ηik^β normalizado
+	sobre todos los candidatos. El numerador y el denominador usan la misma
+	regla de visibilidad. Si ningún candidato tiene peso positivo, se usa la
+	distribución uniforme.
+
+	:param t: La matriz de rastros.
+	:param adjacency: La matriz de adyacencia booleana.
+	:param candidates: Arreglo con los vértices que aún pueden pintarse de color k.
+	:param V_k: Arreglo con los vértices de la clase de color k.
+	:param B: Arreglo con los vértices sin color que ya no pueden pintarse de color k.
+	:params alpha beta: Los metaparámetros del ACO.
+	:param rule: La regla de visibilidad (1, 2 o 3).
+	:return: La probabilidad de escoger pintar cada candidato del color k.
+	:rtype: numpy array.
+	"""
+	weights = tau_k(t, candidates, V_k)**alpha * n_k(adjacency, candidates, B, rule)**beta
+	total = weights.sum()
+	if not total > 0 or not np.isfinite(total):
+		return np.full(len(candidates), 1. / len(candidates))
+	return weights / total
 
 def Gamma(G, F, i):
 	"""
@@ -126,76 +132,108 @@ def Gamma(G, F, i):
 			neighbors.append(v)
 	return neighbors
 
-def select_pik(G, list_color_classes, alpha, beta, t, F):
+def select_pik(t, adjacency, C_k, alpha, beta, F, X):
 	"""
-	Función que recorre la lista F y selecciona un vértice que 
-	es devuelto dependiendo de su probabilidad Pik.
+	Función que selecciona un vértice de la lista F dependiendo de su
+	probabilidad Pik. La regla de visibilidad se elige al azar una sola vez
+	por paso (el artículo menciona que elegirla de forma aleatoria resultó
+	mejor) y la distribución completa se calcula de una vez con P_k.
 
-	:param 	
+	:param t: La matriz de rastros.
+	:param adjacency: La matriz de adyacencia booleana.
+	:param C_k: La clase de color actual.
+	:params alpha beta: Los metaparámetros del ACO.
+	:param F: La lista de vértices aún factibles para colorear con el color k.
+	:param X: La lista de vértices que todavía no han sido pintados.
+	:return: El vértice elegido.
+	:rtype: int.
 	"""
-	circular_l = cycle(F)
-	for i in circular_l:
-		return i
-		k = G.node[i]['color']
-		coin_toss = uniform(0, 1)
-		if coin_toss <= P_ik(G, list_color_classes, i, k, alpha, beta, t):
-			return element 
-
-def _denominator(G, list_color_classes, W, k, alpha, beta, t):
+	candidates = np.asarray(F)
+	B = np.asarray(difference_lists(X, F), dtype=candidates.dtype)
+	V_k = np.asarray(C_k.vertices)
+	rule = randint(1, 3)
+	p = P_k(t, adjacency, candidates, V_k, B, alpha, beta, rule)
+	# Se muestrea con la distribución acumulada.
+	index = np.searchsorted(np.cumsum(p), uniform(0, 1), side='right')
+	return F[min(index, len(F) - 1)]
+
+def trail_scale(dtype, nants, rho):
 	"""
-	Función que calcula el denominador para la fórmula del cálculo de probabilidad.
+	Factor por el que se multiplican los rastros al guardarse en la matriz.
+	Para los tipos flotantes es uno. Para uint16 se elige de modo que la
+	cota superior de los rastros ocupe el rango del tipo: cada hormiga usa al
+	menos un color, así que deposita a lo más 1/(k + 1) <= 1/2 por entrada, y
+	tras cualquier número de ciclos los rastros no superan
+	1 + nants / (2(1 - ρ)). Se reservan nants unidades para el redondeo hacia
+	arriba de los depósitos, que también se guardan en uint16.
 
-	:param G: networkx.Graph
-	:param list_color_classes: La lista de clases de colores.
-	:param W: La lista de vértices que pueden añadirse a la clase de color k.
-	:param k: La etiqueta numérica de la clase de color.
-	:params alpha beta: Los metaparámetros de la metaheurística.
-	:param t: La matriz de rastros.
+	Como τik sólo aparece en la probabilidad como cociente entre candidatos
+	del mismo color, el escalamiento no cambia las probabilidades.
+
+	:param dtype: El tipo de la matriz de rastros.
+	:param nants: El número de hormigas.
+	:param rho: Metaparámetro para la evaporación.
+	:return: El factor de escalamiento.
+	:rtype: float.
 	"""
-	result = 0
-	for j in W:
-		# Aplicamos la fórmula del artículo.
-		result += (tau_ik(j, k, list_color_classes, t)**alpha) * (n_ik(G, list_color_classes, j, k)**beta)
-	return result
+	dtype = np.dtype(dtype)
+	if dtype not in TRAIL_DTYPES:
+		raise ValueError("Tipo de matriz de rastros no soportado: %s." % dtype)
+	if dtype.kind == 'f':
+		return 1.
+	if not 0 <= rho < 1:
+		raise ValueError("Con rastros enteros se necesita 0 <= ρ < 1.")
+	scale = (np.iinfo(dtype).max - nants) / (1. + nants / (2. * (1. - rho)))
+	if scale < 1:
+		raise ValueError("Demasiadas hormigas para rastros de tipo %s." % dtype)
+	return scale
 
-def initialise_trail_matrix(V):
+def initialise_trail_matrix(V, out=None, dtype=np.float64, scale=1.):
 	"""
 	Función que inicializa la matriz de rastros.
 	
 	:param V: La lista de vértices a partir de la que se creará la matriz.
+	:param out: Matriz opcional de |V|×|V| ya reservada que se reutiliza
+	            en lugar de reservar una nueva (en tal caso se usa su tipo).
+	:param dtype: El tipo de la matriz si hay que reservarla (véase TRAIL_DTYPES).
+	:param scale: El factor de escalamiento de los rastros (véase trail_scale).
 	:return: La matriz de rastros inicializada.
 	:rtype: numpy array.
 	"""
 	n = len(V)
-	# Se inicializa con puros ceros. Es cuadrada.
-	M = np.zeros((n,n))
-	for i in range(n):
-		for j in range(n):
-			# Colocamos un uno en la entrada actual en caso de que no sean
-			# iguales los índices porque se refieren al link entre el mismo
-			# vértice.
-			if i != j:
-				M[i][j] = 1.
+	# Es cuadrada; si no nos dieron una matriz, se reserva una nueva.
+	M = np.empty((n,n), dtype=dtype) if out is None else out
+	if M.shape != (n, n):
+		raise ValueError("La matriz de rastros debe ser de %dx%d." % (n, n))
+	# Colocamos un uno (escalado) en las entradas fuera de la diagonal y un cero
+	# en la diagonal, porque ésta se refiere al link entre el mismo vértice.
+	M.fill(np.rint(scale) if M.dtype.kind == 'u' else scale)
+	np.fill_diagonal(M, 0)
 	return M
 
-def initialise_trail_update_matrix(t):
+def initialise_trail_update_matrix(t, out=None):
 	"""
 	Función que inicializa la matriz de actualización para la otra matriz
-	de rastros.
+	de rastros. Para no reservar una matriz nueva en cada ciclo, se puede
+	pasar la del ciclo anterior y se pone en ceros sin reservar memoria.
 
 	:param t: La matriz de rastros.
-	:return: La matriz para la actualización de la otra matriz t.
+	:param out: Matriz de actualización opcional, ya reservada, que se reutiliza.
+	:return: La matriz para la actualización de la otra matriz t, en ceros.
 	:rtype: numpy array.
 	"""
-	# A partir de las dimensiones de la otra matriz de rastros, comenzamos a iterar.
-	delta = t
-	for row in delta:
-		for entry in row:
-			# Simplemente cada entrada se inicializa con un cero.
-			entry = 0
-	return delta
-
-def ANTCOL(G, ncycles, nants, alpha, beta, rho, k):
+	# Los depósitos se guardan con el mismo tipo que los rastros (escalados en el
+	# caso de uint16), para no recorrer más memoria de la necesaria.
+	if out is None:
+		return np.zeros(t.shape, dtype=t.dtype)
+	if out.shape != t.shape or out.dtype != t.dtype:
+		raise ValueError("La matriz de actualización debe ser de %dx%d y de tipo %s."
+		                 % (t.shape + (t.dtype,)))
+	out.fill(0)
+	return out
+
+def ANTCOL(G, ncycles, nants, alpha, beta, rho, k, verbose=True, time_budget=None, trails=None,
+           trail_dtype=np.float64, delta=None, adjacency=None, stats=None):
 	"""
 	Procedimiento principal para la metaheurística descrita en el artículo.
 
@@ -207,42 +245,115 @@ def ANTCOL(G, ncycles, nants, alpha, beta, rho, k):
 	:param rho: Metaparámetro para la evaporación.
 	:param k: El número de particiones existentes en la gráfica sobre la que se trabajará.
 	          Servirá potencialmente para hacer optimizaciones.
-	:return: La lista de clases de colores que se obtuvieron para la coloración de G.
+	:param verbose: Si es falso no se imprime el avance (ni se importa tableprint).
+	:param time_budget: Tiempo máximo en segundos. Se revisa antes de cada hormiga,
+	                    así que siempre termina al menos una y el presupuesto se
+	                    excede a lo más por lo que tarda una hormiga; una vez
+	                    agotado se omiten las hormigas y los ciclos restantes.
+	:param trails: Matriz opcional de |V|×|V| ya reservada para los rastros, para no
+	               reservar una nueva en cada ejecución. Si se da, su tipo manda
+	               sobre trail_dtype.
+	:param trail_dtype: El tipo de la matriz de rastros (véase TRAIL_DTYPES). float32
+	                    reduce a la mitad la memoria que se recorre en cada ciclo, y
+	                    uint16 (escalado) a la cuarta parte. uint16 sólo ahorra
+	                    memoria: cada bloque se convierte a float32 al actualizar
+	                    los rastros, así que cada ciclo es más lento que con float64.
+	:param delta: Matriz de actualización opcional ya reservada, del mismo tipo
+	              que los rastros.
+	:param adjacency: Matriz booleana de |V|×|V| opcional ya reservada para la
+	                  adyacencia.
+	:param stats: Diccionario opcional donde se guarda la convergencia: los colores
+	              y conflictos de la mejor coloración ('colors', 'conflicts'), el
+	              ciclo y los segundos (desde el primer ciclo) en que se alcanzó
+	              por primera vez ('best_cycle', 'best_seconds') y los ciclos
+	              iniciados ('cycles').
+	:return: La lista de clases de colores de la mejor coloración encontrada por
+	         todas las hormigas en todos los ciclos (la de menos conflictos y, entre
+	         ellas, la de menos colores). Esa coloración es la que queda en G.
 	:rtype: [ColorClass].
 	"""
-	tp.banner("Lista de Vértices V: ")
 	V = list(G)
-	print(V)
-	tp.banner("Lista de aristas E: ")
 	E = list(G.edges)
-	print(E)
-	t = initialise_trail_matrix(V)										# Inicializar matriz de rastros.
-	list_color_classes = []
+	if verbose:
+		import tableprint as tp
+		tp.banner("Lista de Vértices V: ")
+		print(V)
+		tp.banner("Lista de aristas E: ")
+		print(E)
+	if trails is not None:
+		trail_dtype = trails.dtype
+	scale = trail_scale(trail_dtype, nants, rho)
+	t = initialise_trail_matrix(V, trails, trail_dtype, scale)			# Inicializar matriz de rastros.
+	delta = initialise_trail_update_matrix(t, delta)					# Se reserva una sola vez y se reutiliza.
+	adjacency = adjacency_matrix(G, adjacency)							# Para evaluar la visibilidad por lotes.
+	edges = np.array(E, dtype=np.intp).reshape(-1, 2)					# Para contar los conflictos de cada hormiga.
+	best = None															# La mejor coloración: (conflictos, colores, clases).
+	start = time.perf_counter()
+	out_of_time = False
+	if stats is None:
+		stats = {}
+	stats['cycles'] = 0
 	for cycle in range(1, ncycles + 1):
-		print("> ciclo:", cycle)
-		delta = initialise_trail_update_matrix(t)						# Inicializar matriz de actualización de rastros.
+		stats['cycles'] = cycle
+		if verbose:
+			print("> ciclo:", cycle)
+		initialise_trail_update_matrix(t, delta)						# Inicializar matriz de actualización de rastros.
 
 		for ant in range(1, nants + 1):
-			print("\t-- hormiga:", ant)
-			X = V                               						# Inicializar la lista de vértices no coloreados.
+			if time_budget is not None and best is not None and time.perf_counter() - start >= time_budget:
+				out_of_time = True
+				break
+			if verbose:
+				print("\t-- hormiga:", ant)
+			X = list(V)                         						# Inicializar la lista de vértices no coloreados.
 			k = 0                                               		# Inicializar el número de colores usados.
+			list_color_classes = []										# Las clases de color de esta hormiga.
 			while X:
 				k = k + 1
 				C_k = ColorClass(k)										# Inicializar la clase de color k.
 				list_color_classes.append(C_k)
 								
-				F = X													# Inicializar la lista de vértices aún factibles para colorear con k.												
+				F = list(X)												# Inicializar la lista de vértices aún factibles para colorear con k.
 				i = select_with_probability(F, 1/len(F))	   			# Seleccionar i ∈ F con probabilidad 1/|F|.
-				COLOUR_VERTEX(G, i, k, list_color_classes, F, 	X)				
+				F = COLOUR_VERTEX(G, i, k, list_color_classes, F, X)
 				while F:
 					
-					i = select_pik(G, list_color_classes, alpha, beta, t, F)
-					COLOUR_VERTEX(G, i, k, list_color_classes, F, X)		
+					i = select_pik(t, adjacency, C_k, alpha, beta, F, X)
+					F = COLOUR_VERTEX(G, i, k, list_color_classes, F, X)
 				
-			update_trail_update_matrix(G, delta, k)						# Actualizar matriz de actualización de rastros.
+			conflicts = count_conflicts(list_color_classes, edges, len(V))
+			if best is None or (conflicts, k) < best[:2]:
+				best = (conflicts, k, list_color_classes)				# Guardar la mejor coloración.
+				stats.update(conflicts=conflicts, colors=k, best_cycle=cycle,
+				             best_seconds=time.perf_counter() - start)
+			update_trail_update_matrix(G, delta, k, scale)				# Actualizar matriz de actualización de rastros.
+		if out_of_time:
+			break
 		update_trail_matrix(G, t, delta, rho)							# Actualizar matriz de rastros.
 	
-	return list_color_classes 											# Regresar las clases de color.
+	if best is None:
+		return []
+	# Dejando en G la mejor coloración y no la de la última hormiga.
+	for C_k in best[2]:
+		for v in C_k.vertices:
+			G.nodes[v]['color'] = C_k.color
+	return best[2] 														# Regresar las clases de color.
+
+def count_conflicts(list_color_classes, edges, n):
+	"""
+	Cuenta las aristas cuyos extremos quedaron del mismo color en la
+	coloración descrita por las clases de color.
+
+	:param list_color_classes: La lista de clases de color (cubre a todos los vértices).
+	:param edges: Arreglo de |E|×2 con las aristas.
+	:param n: El número de vértices.
+	:return: El número de conflictos.
+	:rtype: int.
+	"""
+	colors = np.zeros(n, dtype=np.intp)
+	for C_k in list_color_classes:
+		colors[C_k.vertices] = C_k.color
+	return int(np.count_nonzero(colors[edges[:, 0]] == colors[edges[:, 1]]))
 
 def COLOUR_VERTEX(G, i, k, list_color_classes, F, X):
 	"""
@@ -254,8 +365,10 @@ def COLOUR_VERTEX(G, i, k, list_color_classes, F, X):
 	:param list_color_classes: La lista de clases de color.
 	:param F: La lista de vértices aún factibles para colorear con el color k.
 	:param X: La lista de vértices que todavía no han sido pintados.
+	:return: La lista F actualizada: sin i ni sus vecinos.
+	:rtype: [int]
 	"""
-	G.node[i]['color'] = k
+	G.nodes[i]['color'] = k
 	# Ya estamos pintando el vértice, así que lo quitamos de la lista de los aún no coloreados.
 	X.remove(i)
 	# Obtenemos la clase de color asociada a la etiqueta numérica k.
@@ -263,9 +376,9 @@ def COLOUR_VERTEX(G, i, k, list_color_classes, F, X):
 	# Agregamos el vértice a la clase de color actual.
 	C_k.vertices.append(i)
 	# Actualizando la lista F.
-	F = difference_lists(F, union_lists(Gamma(G, F, i),[i]))
+	return difference_lists(F, union_lists(Gamma(G, F, i),[i]))
 
-def update_trail_update_matrix(G, delta, k):
+def update_trail_update_matrix(G, delta, k, scale=1.):
 	"""
 	Función para actualizar la matriz que sirve para actualizar
 	la otra matriz de rastros.
@@ -274,33 +387,77 @@ def update_trail_update_matrix(G, delta, k):
 	:param delta: La matriz para la actualización al momento presente.
 	:param k: La nueva etiqueta numérica que fue creada en la iteración actual
 	          por la hormiga actual.
+	:param scale: El factor de escalamiento de los rastros (véase trail_scale).
+
+	Con Δ entera, redondear cada depósito al entero más cercano perdería los
+	depósitos menores a media unidad (muchos colores con pocas unidades por
+	rastro). Por eso se redondea de forma estocástica, una vez por clase de
+	color: hacia arriba con probabilidad igual a la parte fraccionaria, de modo
+	que en promedio se deposita exactamente scale/(k + 1).
 	"""
 	# Viendo la cantidad en que deberemos incrementar algunas entradas.
-	increase = 1 / (k + 1)
-	# Recorriendo la matriz.
-	for i,row in enumerate(delta):
-		for j, entry in enumerate(row):
-			# Incrementando el valor de la entrada en los casos en que no coinciden los 
-			# índices y tienen asociado el mismo color (son de la misma clase de color).
-			if i != j and G.node[i]['color'] == G.node[j]['color']:
-				delta[i][j] += increase
+	increase = scale / (k + 1)
+	integer = delta.dtype.kind == 'u'
+	# Agrupando los vértices por color: se incrementan las entradas de los vértices
+	# que tienen asociado el mismo color (son de la misma clase de color).
+	classes = {}
+	for i in range(len(delta)):
+		classes.setdefault(G.nodes[i]['color'], []).append(i)
+	for vertices in classes.values():
+		if len(vertices) > 1:
+			amount = increase
+			if integer:
+				whole = int(increase)
+				amount = delta.dtype.type(whole + (uniform(0, 1) < increase - whole))
+				if not amount:
+					continue
+			delta[np.ix_(vertices, vertices)] += amount
+	# Las entradas en las que coinciden los índices no se incrementan.
+	np.fill_diagonal(delta, 0)
 
 def update_trail_matrix(G, t, delta, rho):
 	"""
-	Función de actualización de la matriz de rastros.
+	Función de actualización de la matriz de rastros: t = ρ·t + Δ, en su lugar.
+	La evaporación y el depósito se hacen juntos por bloques de renglones que
+	caben en caché, así que cada entrada de t y de Δ se lee de memoria una sola
+	vez. La diagonal de ambas es cero, por lo que sigue siéndolo.
+
+	Con rastros uint16 (Δ ya viene escalado y en uint16) cada bloque se calcula
+	en un bloque auxiliar float32 reservado una sola vez, se redondea y se
+	guarda de vuelta, sin crear matrices temporales.
 
 	:param G: networkx.Graph
 	:param t: Matriz de rastros.
 	:param delta: Matriz de actualización de la matriz de rastros.
 	:param rho: Metaparámetro para la evaporación de los rastros (feromonas).
 	"""
-	for i in range(len(G.nodes)):
-		for j in range(len(G.nodes)):
-			if i != j:
-				t[i][j] = (rho * t[i][j]) + delta[i][j]
+	n = len(t)
+	rows = max(1, _BLOCK_ENTRIES // max(1, n))
+	if t.dtype.kind == 'u':
+		top = np.iinfo(t.dtype).max
+		rho = np.float32(rho)
+		scratch = np.empty((min(rows, n), n), dtype=np.float32)
+		for start in range(0, n, rows):
+			block = t[start:start + rows]
+			work = scratch[:len(block)]
+			np.multiply(block, rho, out=work)
+			np.add(work, delta[start:start + rows], out=work)
+			np.rint(work, out=work)
+			np.minimum(work, top, out=work)
+			np.copyto(block, work, casting='unsafe')
+	else:
+		for start in range(0, n, rows):
+			block = t[start:start + rows]
+			block *= rho
+			block += delta[start:start + rows]
 
 if __name__ == '__main__':
 
+	import tableprint as tp 			  # Propósitos estéticos.
+	from draw import draw_graph           # Dibujar las gráficas (a archivo).
+	from utils import (create_k_partite, clear_colors, test, generate_single_color_list,
+	                   get_colors_strings, count_global_conflicts)
+
 	# Inicio y pidiendo máximo número de vértices al usuario.
 	tp.banner("Algoritmo ANTCOL (Algoritmo ACO de Dowsland y Thompson).")
 	num_vertices = int(input("Máximo número de vértices (recomiendo 30): "))
@@ -308,12 +465,9 @@ if __name__ == '__main__':
 	# Contrucción de la gráfica k-partita y dibujándola.
 	print("> Contruyendo gráfica aleatoria k-partita que sabemos es k-coloreable...")
 	G, k = create_k_partite(num_vertices)
-	print("\n> Mostrando la gráfica generada (cerrar el plot para continuar)...")
-	plt.figure()
 	title = "Gráfica G original, " + str(k) + "-partita" 
-	plt.title(title, color='blue')
-	nx.draw(G, node_color='black', with_labels=True, font_weight='bold', font_color='white')
-	plt.show()
+	filename = draw_graph(G, "grafica_original.png", title, node_color='black', title_color='blue')
+	print("\n> La gráfica generada se guardó en", filename)
 	
 	# Inicio:
 	print("\n> Comenzando ejecución de la metaheurística sobre G...")
@@ -335,9 +489,7 @@ if __name__ == '__main__':
 	
 	# Dibujando la gráfica resultante y checando el número de conflictos existentes.
 	print("\n> La ejecución ha terminado, dibujando la gráfica...")
-	plt.figure()
 	title = "Gráfica pintada con " + str(total_colors) + " colores" 
 	print("No. total de conflictos:", count_global_conflicts(G))
-	plt.title(title, color='red')
-	nx.draw(G, node_color=colors, with_labels=True, font_weight='bold', font_color='white')
-	plt.show()
\ No newline at end of file
+	filename = draw_graph(G, "grafica_coloreada.png", title, node_color=colors, title_color='red')
+	print("> La gráfica coloreada se guardó en", filename)
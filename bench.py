@@ -0,0 +1,161 @@
+# -*- coding = utf-8 -*-
+#!/usr/bin/env python
+
+"""bench.py: Mediciones de rendimiento de la implementación de ANTCOL."""
+__author__ = "Concha Vázquez Miguel"
+__copyright__ = "Copyright (C) 2018 Miguel Concha"
+__license__ = "GPL"
+__version__ = "1.0"
+__maintainer__ = "Miguel Concha"
+__email__ = "mconcha@ciencias.unam.mx"
+__status__ = "Completo"
+
+import os
+import random                         # Semillas de las ejecuciones.
+import subprocess                     # Procesos nuevos para medir el arranque en frío.
+import sys
+import time                           # Medición del tiempo de pared.
+
+# El directorio del repositorio, para que los procesos hijos encuentren los módulos.
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def _spawn_time(code):
+	"""
+	Mide el tiempo de pared de un intérprete nuevo que ejecuta code.
+
+	:param code: El código de python a ejecutar.
+	:return: El tiempo en segundos.
+	:rtype: float.
+	"""
+	start = time.perf_counter()
+	subprocess.run([sys.executable, '-c', code], cwd=HERE, check=True)
+	return time.perf_counter() - start
+
+def import_time(module, repeat=5):
+	"""
+	Tiempo de importación de module en un proceso nuevo, descontando el
+	arranque del propio intérprete. Se toma el mínimo de repeat mediciones
+	para reducir el ruido.
+
+	:param module: El nombre del módulo a importar.
+	:param repeat: El número de mediciones.
+	:return: El tiempo de importación en milisegundos.
+	:rtype: float.
+	"""
+	baseline = min(_spawn_time('pass') for _ in range(repeat))
+	measured = min(_spawn_time('import ' + module) for _ in range(repeat))
+	return max(0., measured - baseline) * 1000
+
+def bench_imports(modules=('numpy', 'utils', 'antcol', 'sweep', 'draw'), repeat=5):
+	"""
+	Mide el tiempo de importación de cada uno de los módulos.
+
+	:param modules: Los nombres de los módulos.
+	:param repeat: El número de mediciones por módulo.
+	:return: Las filas (módulo, milisegundos).
+	:rtype: [(string, float)]
+	"""
+	return [(module, import_time(module, repeat)) for module in modules]
+
+def bench_trail_update(n=2000, nants=10, rho=0.5, ncycles=10, dtypes=('float64', 'float32', 'uint16'), seed=0):
+	"""
+	Mide las pasadas sobre memoria de un ciclo (poner Δ en ceros y la evaporación
+	junto con el depósito) para cada tipo de matriz, sobre coloraciones aleatorias
+	de n vértices. Los depósitos de las hormigas se hacen pero no se miden, pues
+	dependen de las clases de color y no del tipo de la matriz.
+
+	:param n: El orden de la gráfica.
+	:param nants: El número de hormigas por ciclo.
+	:param rho: Metaparámetro para la evaporación.
+	:param ncycles: El número de ciclos medidos.
+	:param dtypes: Los tipos de la matriz de rastros.
+	:param seed: La semilla de las coloraciones.
+	:return: Las filas (tipo, MB de t y Δ, milisegundos por ciclo).
+	:rtype: [(string, float, float)]
+	"""
+	import networkx as nx
+	from antcol import (trail_scale, initialise_trail_matrix, initialise_trail_update_matrix,
+	                    update_trail_update_matrix, update_trail_matrix)
+
+	G = nx.empty_graph(n)
+	rng = random.Random(seed)
+	colorings = [[rng.randint(1, 10) for _ in range(n)] for _ in range(nants)]
+	rows = []
+	for dtype in dtypes:
+		scale = trail_scale(dtype, nants, rho)
+		t = initialise_trail_matrix(range(n), dtype=dtype, scale=scale)
+		delta = initialise_trail_update_matrix(t)
+		elapsed = 0.
+		for _ in range(ncycles):
+			start = time.perf_counter()
+			initialise_trail_update_matrix(t, delta)
+			elapsed += time.perf_counter() - start
+			for coloring in colorings:
+				for v, c in enumerate(coloring):
+					G.nodes[v]['color'] = c
+				update_trail_update_matrix(G, delta, max(coloring), scale)
+			start = time.perf_counter()
+			update_trail_matrix(G, t, delta, rho)
+			elapsed += time.perf_counter() - start
+		elapsed /= ncycles
+		rows.append((dtype, (t.nbytes + delta.nbytes) / 2**20, elapsed * 1000))
+	return rows
+
+# Casos de bench_trail_quality: (nombre, n, p, hormigas, ciclos, semillas). El
+# segundo usa muchos vértices y hormigas, de modo que se necesitan muchos colores
+# y cada depósito escalado en uint16 es de apenas unas unidades.
+QUALITY_CASES = (
+	('G(60, 0.3)', 60, 0.3, 15, 20, range(5)),
+	('G(300, 0.5)', 300, 0.5, 100, 5, range(2)),
+)
+
+def bench_trail_quality(cases=QUALITY_CASES, dtypes=('float64', 'float32', 'uint16')):
+	"""
+	Compara la calidad de las soluciones de ANTCOL con cada tipo de matriz de
+	rastros, usando las mismas gráficas y semillas. Los rastros guían el muestreo,
+	así que con distinta precisión las ejecuciones pueden separarse; por eso se
+	comparan los promedios de colores y de conflictos de la mejor coloración
+	(la que ANTCOL deja en la gráfica) y no los rastros finales.
+	Se usan gráficas aleatorias G(n, p): en las k-partitas de create_k_partite
+	todas las ejecuciones encuentran los k colores, sin importar los rastros.
+
+	:param cases: Las tuplas (nombre, n, p, hormigas, ciclos, semillas); cada
+	              semilla genera su gráfica y su ejecución.
+	:param dtypes: Los tipos de la matriz de rastros.
+	:return: Las filas (caso, tipo, colores, conflictos, segundos por ciclo).
+	:rtype: [(string, string, float, float, float)]
+	"""
+	import numpy as np
+	import networkx as nx
+	from antcol import ANTCOL
+	from utils import clear_colors, count_colors, count_global_conflicts
+
+	rows = []
+	for name, n, p, nants, ncycles, seeds in cases:
+		totals = {dtype: [0, 0, 0.] for dtype in dtypes}
+		for seed in seeds:
+			G = nx.gnp_random_graph(n, p, seed=seed)
+			for dtype in dtypes:
+				random.seed(seed)
+				np.random.seed(seed)
+				clear_colors(G)
+				t = np.empty((n, n), dtype=dtype)
+				start = time.perf_counter()
+				ANTCOL(G, ncycles, nants, 1, 0.5, 0.5, 0, verbose=False, trails=t)
+				totals[dtype][2] += (time.perf_counter() - start) / ncycles
+				totals[dtype][0] += count_colors(G)
+				totals[dtype][1] += count_global_conflicts(G)
+		runs = len(seeds)
+		rows.extend((name, dtype, c / runs, x / runs, s / runs) for dtype, (c, x, s) in totals.items())
+	return rows
+
+if __name__ == '__main__':
+
+	import tableprint as tp 			  # Propósitos estéticos.
+
+	tp.banner("Tiempo de importación (ms)")
+	tp.table(bench_imports(), ['módulo', 'ms'])
+	tp.banner("Actualización de rastros por ciclo")
+	tp.table(bench_trail_update(), ['tipo', 'MB', 'ms/ciclo'])
+	tp.banner("Calidad de la solución por tipo de rastros")
+	tp.table(bench_trail_quality(), ['caso', 'tipo', 'colores', 'conflictos', 's/ciclo'])
@@ -0,0 +1,39 @@
+# -*- coding = utf-8 -*-
+#!/usr/bin/env python
+
+"""draw.py: Dibujo de las gráficas coloreadas por ANTCOL. Es opcional:
+   el núcleo del algoritmo no lo importa, y sólo se carga cuando se quiere
+   dibujar. Se dibuja directamente a un archivo, sin necesidad de pantalla."""
+__author__ = "Concha Vázquez Miguel"
+__copyright__ = "Copyright (C) 2018 Miguel Concha"
+__license__ = "GPL"
+__version__ = "1.0"
+__maintainer__ = "Miguel Concha"
+__email__ = "mconcha@ciencias.unam.mx"
+__status__ = "Completo"
+
+import networkx as nx                                       # Gráficas.
+from matplotlib.figure import Figure                        # Figura sin pyplot.
+from matplotlib.backends.backend_agg import FigureCanvasAgg # Lienzo sin pantalla (Agg).
+
+def draw_graph(G, filename, title, node_color='black', title_color='black'):
+	"""
+	Dibuja la gráfica G y guarda la imagen en filename. Se usa el lienzo
+	Agg directamente en lugar de pyplot, por lo que no se necesita un
+	backend de matplotlib con pantalla.
+
+	:param G: networkx.Graph
+	:param filename: La ruta del archivo de imagen (el formato se deduce de la extensión).
+	:param title: El título de la figura.
+	:param node_color: Un color para todos los vértices o una lista con un color por vértice.
+	:param title_color: El color del título.
+	:return: La ruta del archivo generado.
+	:rtype: string.
+	"""
+	figure = Figure()
+	FigureCanvasAgg(figure)
+	ax = figure.add_subplot(1, 1, 1)
+	ax.set_title(title, color=title_color)
+	nx.draw(G, ax=ax, node_color=node_color, with_labels=True, font_weight='bold', font_color='white')
+	figure.savefig(filename)
+	return filename
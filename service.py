@@ -0,0 +1,451 @@
+# -*- coding = utf-8 -*-
+#!/usr/bin/env python
+
+"""service.py: Servicio de larga duración que colorea muchas gráficas con
+   ANTCOL. Recibe trabajos por un socket local, los reparte en una alberca
+   de procesos que se mantienen calientes y devuelve los resultados
+   conforme van terminando.
+
+   Protocolo: el cliente envía un trabajo por línea en JSON y cierra su
+   lado de escritura; el servidor responde con un resultado por línea, en
+   el orden en que terminan. Un trabajo tiene la forma
+
+   {"id": ..., "vertices": n, "edges": [[u, v], ...], "k": ...,
+    "params": {"ncycles": ..., "nants": ..., "alpha": ..., "beta": ..., "rho": ...},
+    "priority": 0, "time_budget": segundos, "seed": ..., "trail_dtype": "float32"}
+
+   donde los vértices son 0, ..., n - 1 y todo salvo "vertices" y "edges"
+   es opcional. Una prioridad menor se atiende antes. El presupuesto de
+   tiempo cuenta desde que el servicio recibe el trabajo: el tiempo que
+   pasa en la cola se descuenta, y el resultado lo reporta en "queued"."""
+__author__ = "Concha Vázquez Miguel"
+__copyright__ = "Copyright (C) 2018 Miguel Concha"
+__license__ = "GPL"
+__version__ = "1.0"
+__maintainer__ = "Miguel Concha"
+__email__ = "mconcha@ciencias.unam.mx"
+__status__ = "Completo"
+
+import argparse                       # Argumentos de línea de comandos.
+import heapq                          # Cola de prioridades de los trabajos.
+import importlib                      # Importación anticipada en los procesos.
+import itertools
+import json                           # Formato de los trabajos y resultados.
+import math
+import os
+import queue                          # Entrega de resultados entre hilos.
+import socket
+import socketserver                   # Servidor local.
+import threading
+import time                           # Medición del tiempo de pared.
+from multiprocessing import Pool      # Alberca de procesos.
+
+# Matrices de trabajo de cada proceso de la alberca (rastros, actualización y
+# adyacencia). Por cada nombre y tipo se guarda sólo la más grande pedida hasta
+# ahora; las gráficas más pequeñas usan una vista de su esquina superior.
+_BUFFERS = {}
+
+def _warm_worker():
+	"""
+	Inicializador de cada proceso de la alberca: importa de antemano los
+	módulos del algoritmo para que ningún trabajo pague su importación.
+	"""
+	for name in ('numpy', 'networkx', 'antcol', 'utils'):
+		importlib.import_module(name)
+
+def _buffer(name, n, dtype):
+	"""
+	Devuelve una matriz de n×n del proceso actual para el uso name. Sólo se
+	reserva memoria cuando llega una gráfica más grande que todas las
+	anteriores con ese uso y tipo, así que la memoria de cada proceso queda
+	acotada por la gráfica más grande que ha visto.
+
+	:param name: El uso de la matriz ('trails', 'delta' o 'adjacency').
+	:param n: El orden de la gráfica.
+	:param dtype: El tipo de la matriz.
+	:rtype: numpy array.
+	"""
+	import numpy as np
+	dtype = np.dtype(dtype)
+	M = _BUFFERS.get((name, dtype))
+	if M is None or len(M) < n:
+		M = _BUFFERS[name, dtype] = np.empty((n, n), dtype=dtype)
+	return M[:n, :n]
+
+def solve_job(job, queued=0.):
+	"""
+	Resuelve un trabajo dentro de un proceso de la alberca.
+
+	:param job: El diccionario del trabajo (véase el docstring del módulo).
+	:param queued: Los segundos que el trabajo esperó en la cola; se
+	               descuentan de su presupuesto de tiempo.
+	:return: El id del trabajo, los colores usados, los conflictos, la
+	         coloración (un color por vértice), el tiempo en segundos y el
+	         tiempo de espera en la cola.
+	:rtype: dict.
+	"""
+	import random
+	import numpy as np
+	import networkx as nx
+	from antcol import ANTCOL
+	from utils import clear_colors, count_colors, count_global_conflicts
+
+	n = job['vertices']
+	G = nx.Graph()
+	G.add_nodes_from(range(n))
+	for u, v in job['edges']:
+		# Los vértices indexan la matriz de rastros, así que deben ser 0, ..., n - 1.
+		if not (0 <= u < n and 0 <= v < n):
+			raise ValueError("La arista (%s, %s) tiene vértices fuera de 0..%d." % (u, v, n - 1))
+		G.add_edge(u, v)
+	params = job.get('params', {})
+	if 'seed' in job:
+		random.seed(job['seed'])
+		np.random.seed(job['seed'])
+	clear_colors(G)
+	dtype = np.dtype(job.get('trail_dtype', 'float64'))
+	time_budget = job.get('time_budget')
+	if time_budget is not None:
+		time_budget = max(0., time_budget - queued)
+	start = time.perf_counter()
+	ANTCOL(G, params.get('ncycles', 100), params.get('nants', max(1, n // 4)),
+		   params.get('alpha', 1), params.get('beta', 0.5), params.get('rho', 0.5),
+		   job.get('k', 0), verbose=False, time_budget=time_budget,
+		   trails=_buffer('trails', n, dtype),
+		   delta=_buffer('delta', n, dtype),
+		   adjacency=_buffer('adjacency', n, bool))
+	return {
+		'id': job.get('id'),
+		'colors': count_colors(G),
+		'conflicts': count_global_conflicts(G),
+		'coloring': [G.nodes[v]['color'] for v in range(n)],
+		'seconds': time.perf_counter() - start,
+		'queued': queued,
+	}
+
+class SolverService:
+	"""
+	Despachador de trabajos. Los trabajos esperan en una cola de prioridades
+	y sólo se mandan a la alberca cuando hay un proceso libre, de modo que
+	la prioridad decide qué trabajo se atiende a continuación.
+
+	Un proceso que muere (por ejemplo, por falta de memoria) nunca entrega
+	su trabajo; por eso un hilo vigilante da por perdido, con un error, todo
+	trabajo que lleve más de task_timeout segundos en la alberca.
+
+	Atributos:
+	----------
+
+	processes: int
+			   El número de procesos de la alberca.
+	max_vertices: int
+				  El mayor orden de gráfica que se acepta.
+	task_timeout: float
+				  Los segundos tras los que un trabajo en curso se da por perdido
+				  (None para no vigilarlos).
+	"""
+
+	def __init__(self, processes=None, max_vertices=5000, task_timeout=600.):
+		"""
+		Constructor del servicio; arranca la alberca de procesos.
+
+		:param processes: El número de procesos (por omisión, os.cpu_count()).
+		:param max_vertices: El mayor orden aceptado; cada proceso reserva tres
+		                     matrices de max_vertices×max_vertices como máximo.
+		:param task_timeout: Los segundos tras los que un trabajo en curso se da
+		                     por perdido (None para no vigilarlos).
+		"""
+		self.processes = processes or os.cpu_count()
+		self.max_vertices = max_vertices
+		self.task_timeout = task_timeout
+		self._pool = Pool(self.processes, initializer=_warm_worker)
+		self._lock = threading.Lock()
+		# Se notifica cada vez que cambian los trabajos pendientes o en curso.
+		self._changed = threading.Condition(self._lock)
+		self._pending = []
+		# Los trabajos en curso: ficha -> (fecha límite, trabajo, callback).
+		self._running = {}
+		self._sequence = itertools.count()
+		# Si algún trabajo se dio por perdido, la alberca no puede cerrarse esperándolo.
+		self._lost = False
+		# _closing: ya no se aceptan trabajos; _closed: la alberca ya no recibe más.
+		self._closing = False
+		self._closed = False
+		self._watchdog = threading.Thread(target=self._watch, daemon=True)
+		self._watchdog.start()
+
+	def _validate(self, job):
+		"""
+		Revisa lo que hay que saber antes de encolar un trabajo: su prioridad
+		y su orden (del que depende la memoria que reservará el proceso).
+
+		:param job: El diccionario del trabajo.
+		:return: El error encontrado, o None si el trabajo es válido.
+		:rtype: Exception.
+		"""
+		priority = job.get('priority', 0)
+		if isinstance(priority, bool) or not isinstance(priority, (int, float)) or math.isnan(priority):
+			return ValueError("La prioridad debe ser un número.")
+		n = job.get('vertices')
+		if isinstance(n, bool) or not isinstance(n, int) or n < 0:
+			return ValueError("El número de vértices debe ser un entero no negativo.")
+		if n > self.max_vertices:
+			return ValueError("La gráfica tiene %d vértices; el máximo es %d." % (n, self.max_vertices))
+		return None
+
+	def submit(self, job, callback):
+		"""
+		Encola un trabajo. Cuando termine, se llama a callback con su
+		resultado (desde un hilo del servicio). Si el trabajo no tiene una
+		prioridad numérica, excede max_vertices o el servicio se está
+		cerrando, callback recibe de inmediato un resultado con error.
+
+		:param job: El diccionario del trabajo.
+		:param callback: Función que recibe el diccionario del resultado.
+		"""
+		error = self._validate(job)
+		if error is not None:
+			callback({'id': job.get('id'), 'error': repr(error)})
+			return
+		with self._lock:
+			if self._closing:
+				rejected = True
+			else:
+				rejected = False
+				# La secuencia desempata: a igual prioridad, se atiende primero el más antiguo.
+				heapq.heappush(self._pending, (job.get('priority', 0), next(self._sequence),
+				                               time.monotonic(), job, callback))
+		if rejected:
+			callback({'id': job.get('id'), 'error': repr(RuntimeError("El servicio se está cerrando."))})
+			return
+		self._dispatch()
+
+	def _dispatch(self):
+		"""
+		Manda a la alberca tantos trabajos pendientes como procesos libres haya.
+		Una vez cerrada la alberca ya no se manda nada.
+		"""
+		with self._lock:
+			while not self._closed and self._pending and len(self._running) < self.processes:
+				_, token, submitted, job, callback = heapq.heappop(self._pending)
+				now = time.monotonic()
+				deadline = math.inf if self.task_timeout is None else now + self.task_timeout
+				self._running[token] = (deadline, job, callback)
+				self._pool.apply_async(
+					solve_job, (job, now - submitted),
+					callback=lambda result, token=token: self._finish(token, result),
+					error_callback=lambda error, token=token, job=job:
+						self._finish(token, {'id': job.get('id'), 'error': repr(error)}))
+			self._changed.notify_all()
+
+	def _finish(self, token, result):
+		"""
+		Entrega un resultado y libera el proceso para el siguiente trabajo. Si
+		el trabajo ya se había dado por perdido, el resultado se descarta.
+		"""
+		with self._lock:
+			entry = self._running.pop(token, None)
+		if entry is None:
+			return
+		entry[2](result)
+		self._dispatch()
+
+	def _watch(self):
+		"""
+		Hilo vigilante: entrega como fallidos los trabajos que excedieron su
+		fecha límite, para que no ocupen su lugar para siempre ni impidan
+		cerrar el servicio.
+		"""
+		while True:
+			with self._lock:
+				while True:
+					if self._closed:
+						return
+					now = time.monotonic()
+					expired = [token for token, (deadline, _, _) in self._running.items() if deadline <= now]
+					if expired:
+						break
+					deadline = min((entry[0] for entry in self._running.values()), default=math.inf)
+					self._changed.wait(None if math.isinf(deadline) else deadline - now)
+				expired = [self._running.pop(token) for token in expired]
+				self._lost = True
+			for _, job, callback in expired:
+				callback({'id': job.get('id'), 'error': repr(TimeoutError(
+					"El trabajo no terminó en %s segundos; se da por perdido." % self.task_timeout))})
+			self._dispatch()
+
+	def close(self, drain=True):
+		"""
+		Deja de aceptar trabajos y cierra la alberca. Con drain se atienden
+		antes todos los trabajos pendientes; sin él, los pendientes se
+		entregan como fallidos a su callback y sólo se esperan los que ya
+		están en curso (o hasta que se den por perdidos).
+
+		:param drain: Si se atienden los trabajos pendientes antes de cerrar.
+		"""
+		with self._lock:
+			self._closing = True
+			if drain:
+				dropped = []
+			else:
+				dropped = [(job, callback) for _, _, _, job, callback in self._pending]
+				self._pending = []
+		for job, callback in dropped:
+			callback({'id': job.get('id'), 'error': repr(RuntimeError("El servicio se cerró."))})
+		with self._lock:
+			while self._pending or self._running:
+				self._changed.wait()
+			self._closed = True
+			self._changed.notify_all()
+		self._watchdog.join()
+		if self._lost:
+			# Un trabajo perdido nunca termina, así que la alberca no puede cerrarse esperándolo.
+			self._pool.terminate()
+		else:
+			self._pool.close()
+		self._pool.join()
+
+class _Handler(socketserver.StreamRequestHandler):
+	"""
+	Atiende una conexión: lee los trabajos línea por línea y escribe cada
+	resultado en cuanto termina, sin esperar a que lleguen todos los trabajos.
+	"""
+
+	def handle(self):
+		results = queue.Queue()
+		writer = threading.Thread(target=self._write, args=(results,))
+		writer.start()
+		submitted = 0
+		try:
+			for line in self.rfile:
+				line = line.strip()
+				if not line:
+					continue
+				submitted += 1
+				try:
+					job = json.loads(line.decode('utf-8'))
+					if not isinstance(job, dict):
+						raise ValueError("Un trabajo debe ser un objeto JSON.")
+				except ValueError as error:
+					results.put({'id': None, 'error': repr(error)})
+					continue
+				self.server.service.submit(job, results.put)
+		finally:
+			# Marca el fin de la entrada con el total de resultados a esperar.
+			results.put(submitted)
+			writer.join()
+
+	def _write(self, results):
+		written = 0
+		expected = None
+		while expected is None or written < expected:
+			item = results.get()
+			if isinstance(item, int):
+				expected = item
+				continue
+			self.wfile.write((json.dumps(item) + '\n').encode('utf-8'))
+			self.wfile.flush()
+			written += 1
+
+class SolverServer(socketserver.ThreadingTCPServer):
+	"""
+	Servidor TCP local que atiende cada conexión en su propio hilo y
+	comparte un mismo SolverService entre todas ellas.
+
+	Atributos:
+	----------
+
+	service: SolverService
+			 El servicio al que se mandan los trabajos.
+	"""
+	daemon_threads = True
+	allow_reuse_address = True
+
+	def __init__(self, address, service):
+		"""
+		:param address: La pareja (host, puerto) donde se escucha.
+		:param service: El SolverService que resolverá los trabajos.
+		"""
+		super().__init__(address, _Handler)
+		self.service = service
+
+class Client:
+	"""
+	Cliente del servidor por socket.
+
+	Atributos:
+	----------
+
+	address: (string, int)
+			 La dirección del servidor.
+	"""
+
+	def __init__(self, address):
+		self.address = address
+
+	def solve(self, jobs):
+		"""
+		Envía los trabajos y devuelve los resultados conforme llegan.
+
+		:param jobs: La lista de trabajos.
+		:return: Un generador de resultados, en el orden en que terminan.
+		:rtype: generator.
+		"""
+		with socket.create_connection(self.address) as connection:
+			stream = connection.makefile('rwb')
+			for job in jobs:
+				stream.write((json.dumps(job) + '\n').encode('utf-8'))
+			stream.flush()
+			connection.shutdown(socket.SHUT_WR)
+			for line in stream:
+				yield json.loads(line.decode('utf-8'))
+
+class LocalClient:
+	"""
+	Sustituto del cliente por socket que habla directamente con un
+	SolverService del mismo proceso; tiene la misma interfaz que Client.
+
+	Atributos:
+	----------
+
+	service: SolverService
+			 El servicio al que se mandan los trabajos.
+	"""
+
+	def __init__(self, service):
+		self.service = service
+
+	def solve(self, jobs):
+		"""
+		Envía los trabajos y devuelve los resultados conforme terminan.
+
+		:param jobs: La lista de trabajos.
+		:return: Un generador de resultados, en el orden en que terminan.
+		:rtype: generator.
+		"""
+		results = queue.Queue()
+		jobs = list(jobs)
+		for job in jobs:
+			self.service.submit(job, results.put)
+		for _ in jobs:
+			yield results.get()
+
+if __name__ == '__main__':
+
+	parser = argparse.ArgumentParser(description="Servicio de coloración con ANTCOL.")
+	parser.add_argument('--host', default='127.0.0.1', help="Dirección donde se escucha.")
+	parser.add_argument('--port', type=int, default=8765, help="Puerto donde se escucha.")
+	parser.add_argument('--processes', type=int, default=None, help="Tamaño de la alberca de procesos.")
+	parser.add_argument('--max-vertices', type=int, default=5000, help="Mayor orden de gráfica aceptado.")
+	parser.add_argument('--task-timeout', type=float, default=600.,
+						help="Segundos tras los que un trabajo en curso se da por perdido.")
+	args = parser.parse_args()
+
+	service = SolverService(args.processes, args.max_vertices, args.task_timeout)
+	with SolverServer((args.host, args.port), service) as server:
+		print("> Escuchando en %s:%d" % server.server_address)
+		try:
+			server.serve_forever()
+		except KeyboardInterrupt:
+			pass
+	service.close(drain=False)
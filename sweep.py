@@ -0,0 +1,381 @@
+# -*- coding = utf-8 -*-
+#!/usr/bin/env python
+
+"""sweep.py: Barrido paralelo (en malla o aleatorio) de los meta-parámetros
+   de ANTCOL, con caché en disco de los resultados ya obtenidos."""
+__author__ = "Concha Vázquez Miguel"
+__copyright__ = "Copyright (C) 2018 Miguel Concha"
+__license__ = "GPL"
+__version__ = "1.0"
+__maintainer__ = "Miguel Concha"
+__email__ = "mconcha@ciencias.unam.mx"
+__status__ = "Completo"
+
+import argparse                       # Argumentos de línea de comandos.
+import hashlib                        # Huellas de instancias y configuraciones.
+import itertools                      # Producto cartesiano para la malla.
+import json                           # Serialización de los resultados en caché.
+import os
+import random                         # Semillas y búsqueda aleatoria.
+import time                           # Medición del tiempo de pared.
+from multiprocessing import Pool      # Alberca de procesos.
+
+# Los nombres de los meta-parámetros que recibe ANTCOL (además de la gráfica).
+PARAMETERS = ('ncycles', 'nants', 'alpha', 'beta', 'rho')
+# Versión de los resultados en caché. Forma parte de la llave, así que hay que
+# incrementarla cada vez que cambie la semántica de ANTCOL o el formato de los
+# resultados, para no reutilizar resultados de otra versión del algoritmo.
+CACHE_VERSION = 2
+
+def instance_hash(G):
+	"""
+	Calcula una huella que identifica a la instancia G independientemente
+	del proceso en que fue construida: depende únicamente de sus vértices
+	y de sus aristas.
+
+	:param G: networkx.Graph
+	:return: La huella hexadecimal de la gráfica.
+	:rtype: string.
+	"""
+	nodes = sorted(G.nodes)
+	edges = sorted(tuple(sorted(e)) for e in G.edges)
+	return hashlib.sha1(json.dumps([nodes, edges]).encode('utf-8')).hexdigest()
+
+def default_space(G):
+	"""
+	Espacio de búsqueda por omisión alrededor de los valores del bloque
+	principal de antcol.py (α=1, β=0.5, ρ=0.5, nants=|V|//4).
+
+	:param G: networkx.Graph
+	:return: Diccionario de meta-parámetro a lista de valores posibles.
+	:rtype: dict.
+	"""
+	n = len(G.nodes)
+	return {
+		'ncycles': [100],
+		'nants': sorted({max(1, n // 4), max(1, n // 2)}),
+		'alpha': [1, 2],
+		'beta': [0.5, 1, 2],
+		'rho': [0.3, 0.5, 0.7],
+	}
+
+def grid_configurations(space):
+	"""
+	Genera todas las configuraciones de la malla descrita por space.
+
+	:param space: Diccionario de meta-parámetro a lista de valores.
+	:return: La lista de configuraciones (diccionarios).
+	:rtype: [dict]
+	"""
+	names = sorted(space)
+	return [dict(zip(names, values)) for values in itertools.product(*(space[p] for p in names))]
+
+def random_configurations(space, n, seed=None):
+	"""
+	Genera n configuraciones aleatorias a partir de space. Si el valor
+	asociado a un meta-parámetro es una lista se elige uno de sus elementos;
+	si es una tupla (a, b) se muestrea uniformemente en el intervalo
+	(de forma entera si ambos extremos son enteros).
+
+	:param space: Diccionario de meta-parámetro a lista o intervalo.
+	:param n: El número de configuraciones a generar.
+	:param seed: Semilla para que el muestreo sea reproducible.
+	:return: La lista de configuraciones (diccionarios).
+	:rtype: [dict]
+	"""
+	rng = random.Random(seed)
+	configurations = []
+	for _ in range(n):
+		configuration = {}
+		for p in sorted(space):
+			values = space[p]
+			if isinstance(values, tuple):
+				low, high = values
+				if isinstance(low, int) and isinstance(high, int):
+					configuration[p] = rng.randint(low, high)
+				else:
+					configuration[p] = rng.uniform(low, high)
+			else:
+				configuration[p] = rng.choice(values)
+		configurations.append(configuration)
+	return configurations
+
+class ResultCache:
+	"""
+	Caché en disco de las ejecuciones terminadas. Cada resultado se guarda
+	en su propio archivo JSON, nombrado con la huella de la terna
+	(instancia, meta-parámetros, semilla), de modo que un barrido puede
+	extenderse en otra sesión sin repetir el trabajo ya hecho.
+
+	Atributos:
+	----------
+
+	directory: string
+			   El directorio donde se guardan los resultados.
+	"""
+
+	def __init__(self, directory):
+		"""
+		Constructor de la caché; crea el directorio si no existe.
+
+		:param directory: El directorio donde se guardarán los resultados.
+		"""
+		self.directory = directory
+		os.makedirs(directory, exist_ok=True)
+
+	@staticmethod
+	def key(instance, params, seed):
+		"""
+		Huella de la terna (instancia, meta-parámetros, semilla), junto con
+		CACHE_VERSION.
+
+		:param instance: La huella de la gráfica.
+		:param params: El diccionario de meta-parámetros.
+		:param seed: La semilla de la ejecución.
+		:return: La huella hexadecimal.
+		:rtype: string.
+		"""
+		raw = json.dumps([CACHE_VERSION, instance, params, seed], sort_keys=True)
+		return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+	def _path(self, key):
+		return os.path.join(self.directory, key + '.json')
+
+	def get(self, key):
+		"""
+		Devuelve el resultado guardado para key, o None si no existe.
+
+		:param key: La huella del resultado.
+		:rtype: dict.
+		"""
+		try:
+			with open(self._path(key)) as f:
+				return json.load(f)
+		except (OSError, ValueError):
+			return None
+
+	def put(self, key, result):
+		"""
+		Guarda el resultado para key. Se escribe primero a un archivo temporal
+		y luego se renombra, para no dejar archivos a medias si el barrido
+		se interrumpe.
+
+		:param key: La huella del resultado.
+		:param result: El diccionario con el resultado.
+		"""
+		path = self._path(key)
+		tmp = path + '.tmp'
+		with open(tmp, 'w') as f:
+			json.dump(result, f, sort_keys=True)
+		os.replace(tmp, path)
+
+def run_trial(G, k, params, seed):
+	"""
+	Ejecuta ANTCOL una vez sobre una copia de G con los meta-parámetros y la
+	semilla dados, midiendo el tiempo de pared y la convergencia: el ciclo y
+	los segundos en que se alcanzó por primera vez la mejor coloración.
+
+	:param G: networkx.Graph
+	:param k: El número de particiones de la gráfica.
+	:param params: Diccionario con ncycles, nants, alpha, beta y rho.
+	:param seed: La semilla para los generadores aleatorios.
+	:return: El número de colores y de conflictos de la mejor coloración, el
+	         tiempo en segundos, y el ciclo y los segundos en que se alcanzó.
+	:rtype: dict.
+	"""
+	import numpy as np
+	from antcol import ANTCOL
+	from utils import clear_colors, count_colors, count_global_conflicts
+
+	random.seed(seed)
+	np.random.seed(seed)
+	H = G.copy()
+	clear_colors(H)
+	stats = {}
+	start = time.perf_counter()
+	ANTCOL(H, params['ncycles'], params['nants'], params['alpha'],
+		   params['beta'], params['rho'], k, verbose=False, stats=stats)
+	elapsed = time.perf_counter() - start
+	return {
+		'colors': count_colors(H),
+		'conflicts': count_global_conflicts(H),
+		'seconds': elapsed,
+		'best_cycle': stats.get('best_cycle'),
+		'best_seconds': stats.get('best_seconds'),
+	}
+
+def _worker(job):
+	"""
+	Punto de entrada de cada proceso de la alberca.
+
+	:param job: La tupla (llave, G, k, params, semilla).
+	:return: La llave y el resultado de la ejecución.
+	:rtype: (string, dict)
+	"""
+	key, G, k, params, seed = job
+	return key, run_trial(G, k, params, seed)
+
+def sweep(G, k, configurations, seeds, processes=None, cache=None, family=None):
+	"""
+	Ejecuta ANTCOL sobre G para cada configuración y cada semilla, repartiendo
+	las ejecuciones en una alberca de procesos. Las ternas que ya estén en la
+	caché no se vuelven a ejecutar.
+
+	:param G: networkx.Graph
+	:param k: El número de particiones de la gráfica.
+	:param configurations: La lista de configuraciones de meta-parámetros.
+	:param seeds: La lista de semillas.
+	:param processes: El número de procesos (por omisión, os.cpu_count()).
+	:param cache: Una ResultCache opcional.
+	:param family: Etiqueta de la familia de gráficas a la que pertenece G;
+	               summarise agrupa por ella, de modo que los resultados de
+	               varias instancias de una familia se promedian juntos.
+	:return: La lista de resultados, cada uno con su instancia, familia,
+	         meta-parámetros y semilla.
+	:rtype: [dict]
+	"""
+	instance = instance_hash(G)
+	results = []
+	# Las configuraciones repetidas (posibles en la búsqueda aleatoria) se cuentan
+	# una sola vez, vengan de la caché o de una ejecución nueva.
+	seen = set()
+	jobs = {}
+	for params in configurations:
+		for seed in seeds:
+			key = ResultCache.key(instance, params, seed)
+			if key in seen:
+				continue
+			seen.add(key)
+			cached = cache.get(key) if cache is not None else None
+			if cached is not None:
+				# La familia es sólo una etiqueta y no forma parte de la llave.
+				results.append(dict(cached, family=family))
+			else:
+				jobs[key] = (key, G, k, params, seed)
+	if jobs:
+		with Pool(processes) as pool:
+			for key, outcome in pool.imap_unordered(_worker, list(jobs.values())):
+				_, _, _, params, seed = jobs[key]
+				result = dict(outcome, instance=instance, family=family, params=params, seed=seed)
+				if cache is not None:
+					cache.put(key, result)
+				results.append(result)
+	return results
+
+def summarise(results):
+	"""
+	Agrupa los resultados por familia y configuración y promedia sobre las
+	semillas y las instancias. Las configuraciones se ordenan por el número
+	promedio de conflictos, luego por el de colores y, en caso de empate,
+	por el tiempo promedio. El tiempo hasta la mejor coloración (ciclo y
+	segundos) indica cuánto de cada ejecución hizo falta en realidad.
+
+	:param results: La lista de resultados devuelta por sweep (posiblemente
+	                de varias llamadas, una por instancia).
+	:return: Una fila por familia y configuración con sus promedios.
+	:rtype: [dict]
+	"""
+	groups = {}
+	for r in results:
+		key = json.dumps([r.get('family'), r['params']], sort_keys=True)
+		groups.setdefault(key, []).append(r)
+	summary = []
+	for key, group in groups.items():
+		family, params = json.loads(key)
+		n = len(group)
+		summary.append({
+			'family': family,
+			'params': params,
+			'instances': len({r['instance'] for r in group}),
+			'runs': n,
+			'colors': sum(r['colors'] for r in group) / n,
+			'conflicts': sum(r['conflicts'] for r in group) / n,
+			'seconds': sum(r['seconds'] for r in group) / n,
+			'best_cycle': sum(r['best_cycle'] or 0 for r in group) / n,
+			'best_seconds': sum(r['best_seconds'] or 0. for r in group) / n,
+		})
+	summary.sort(key=lambda s: (str(s['family']), s['conflicts'], s['colors'], s['seconds']))
+	return summary
+
+def print_report(summary):
+	"""
+	Imprime la tabla de colores contra tiempo de pared por familia y
+	configuración, junto con el tiempo hasta la mejor coloración.
+
+	:param summary: Las filas devueltas por summarise.
+	"""
+	import tableprint as tp
+	headers = (['familia'] + list(PARAMETERS)
+			   + ['instancias', 'corridas', 'colores', 'conflictos', 'segundos', 'ciclo mejor', 's al mejor'])
+	rows = []
+	for s in summary:
+		rows.append([s['family']] + [s['params'].get(p) for p in PARAMETERS]
+					+ [s['instances'], s['runs'], s['colors'], s['conflicts'], s['seconds'],
+					   s['best_cycle'], s['best_seconds']])
+	tp.table(rows, headers)
+
+def make_instances(family, count, vertices, seed, p=0.3):
+	"""
+	Genera count instancias de una familia de gráficas, reproducibles a
+	partir de seed.
+
+	:param family: 'k-partita' (create_k_partite) o 'gnp' (G(n, p) aleatoria).
+	:param count: El número de instancias.
+	:param vertices: El máximo número de vértices ('k-partita') o el número
+	                 de vértices ('gnp').
+	:param seed: La semilla de la primera instancia; las demás usan las siguientes.
+	:param p: La probabilidad de cada arista en 'gnp'.
+	:return: Las parejas (gráfica, número de particiones); en 'gnp' no se
+	         conoce, así que es 0.
+	:rtype: [(nx.Graph, int)]
+	"""
+	instances = []
+	for i in range(count):
+		if family == 'k-partita':
+			from utils import create_k_partite
+			random.seed(seed + i)
+			instances.append(create_k_partite(vertices))
+		elif family == 'gnp':
+			import networkx as nx
+			instances.append((nx.gnp_random_graph(vertices, p, seed=seed + i), 0))
+		else:
+			raise ValueError("Familia de gráficas desconocida: %s." % family)
+	return instances
+
+if __name__ == '__main__':
+
+	parser = argparse.ArgumentParser(description="Barrido de meta-parámetros de ANTCOL.")
+	parser.add_argument('--family', default='k-partita', choices=('k-partita', 'gnp'),
+						help="Familia de las gráficas.")
+	parser.add_argument('--instances', type=int, default=1, help="Número de instancias de la familia.")
+	parser.add_argument('--vertices', type=int, default=30,
+						help="Máximo número de vértices (k-partita) o número de vértices (gnp).")
+	parser.add_argument('--p', type=float, default=0.3, help="Probabilidad de cada arista (gnp).")
+	parser.add_argument('--seeds', type=int, default=5, help="Número de semillas por configuración.")
+	parser.add_argument('--random', type=int, default=0, metavar='N',
+						help="Búsqueda aleatoria con N configuraciones en lugar de la malla.")
+	parser.add_argument('--ncycles', type=int, default=100, help="Número de ciclos de ANTCOL.")
+	parser.add_argument('--processes', type=int, default=None, help="Tamaño de la alberca de procesos.")
+	parser.add_argument('--cache', default='.antcol_cache', help="Directorio de la caché de resultados.")
+	parser.add_argument('--instance-seed', type=int, default=0, help="Semilla para generar las gráficas.")
+	args = parser.parse_args()
+
+	instances = make_instances(args.family, args.instances, args.vertices, args.instance_seed, args.p)
+	# Todas las instancias comparten las configuraciones, para poder promediarlas
+	# juntas; el espacio se toma de la instancia más grande.
+	G = max((G for G, _ in instances), key=len)
+	space = default_space(G)
+	space['ncycles'] = [args.ncycles]
+	if args.random:
+		n = len(G.nodes)
+		space.update({'nants': (1, max(1, n // 2)), 'alpha': (0.5, 3.), 'beta': (0.1, 3.), 'rho': (0.1, 0.9)})
+		configurations = random_configurations(space, args.random, seed=args.instance_seed)
+	else:
+		configurations = grid_configurations(space)
+	cache = ResultCache(args.cache)
+	results = []
+	for G, k in instances:
+		print("> Instancia:", instance_hash(G))
+		results += sweep(G, k, configurations, list(range(args.seeds)), args.processes, cache, args.family)
+	print("> Configuraciones: %d, semillas: %d, instancias: %d" % (len(configurations), args.seeds, len(instances)))
+	print_report(summarise(results))
@@ -0,0 +1,83 @@
+# -*- coding = utf-8 -*-
+#!/usr/bin/env python
+
+"""test_service.py: Pruebas del despachador de service.py a través de
+   LocalClient, sin abrir sockets."""
+__author__ = "Concha Vázquez Miguel"
+__copyright__ = "Copyright (C) 2018 Miguel Concha"
+__license__ = "GPL"
+__version__ = "1.0"
+__maintainer__ = "Miguel Concha"
+__email__ = "mconcha@ciencias.unam.mx"
+__status__ = "Completo"
+
+import threading
+import time
+
+import networkx as nx
+
+from service import LocalClient, SolverService
+
+# Una gráfica pequeña para los trabajos rápidos y una grande para los que
+# deben mantener ocupado al único proceso de la alberca.
+SMALL = nx.gnp_random_graph(12, 0.3, seed=1)
+LARGE = nx.gnp_random_graph(80, 0.3, seed=2)
+
+def job(id, G=SMALL, **fields):
+	"""
+	Construye el trabajo id sobre G con pocos ciclos; fields se agregan tal cual.
+	"""
+	return dict({'id': id, 'vertices': len(G), 'edges': [list(e) for e in G.edges],
+	             'params': {'ncycles': 2, 'nants': 2}, 'seed': 0}, **fields)
+
+def blocker(id, seconds):
+	"""
+	Un trabajo que ocupa a su proceso durante unos seconds segundos.
+	"""
+	return job(id, LARGE, params={'ncycles': 10**6, 'nants': 5}, time_budget=seconds)
+
+def test_priority_order():
+	service = SolverService(1)
+	try:
+		# Mientras corre el primero, los demás esperan en la cola y salen por prioridad.
+		jobs = [blocker('blocker', 0.5), job('c', priority=2), job('a', priority=-1), job('b', priority=0.5)]
+		results = list(LocalClient(service).solve(jobs))
+	finally:
+		service.close()
+	assert [r['id'] for r in results] == ['blocker', 'a', 'b', 'c']
+	assert all('error' not in r for r in results)
+	assert all(r['conflicts'] == 0 for r in results)
+
+def test_invalid_jobs():
+	service = SolverService(1, max_vertices=50)
+	try:
+		jobs = [job('priority', priority='alta'), job('edge', edges=[[0, 12]]),
+		        job('dtype', trail_dtype='int8'), job('large', LARGE), job('ok')]
+		results = {r['id']: r for r in LocalClient(service).solve(jobs)}
+	finally:
+		service.close()
+	assert 'prioridad' in results['priority']['error']
+	assert 'fuera de' in results['edge']['error']
+	assert 'no soportado' in results['dtype']['error']
+	assert 'máximo es 50' in results['large']['error']
+	assert 'error' not in results['ok']
+
+def test_close_without_drain():
+	service = SolverService(1)
+	jobs = [blocker('blocker', 1.), job('a'), job('b')]
+	# El cierre llega mientras el primero sigue en curso y los demás en la cola.
+	closer = threading.Timer(0.3, service.close, kwargs={'drain': False})
+	closer.start()
+	results = list(LocalClient(service).solve(jobs))
+	closer.join()
+	assert [r['id'] for r in results] == ['a', 'b', 'blocker']
+	assert all('se cerró' in r['error'] for r in results[:2])
+	assert 'error' not in results[2]
+
+def test_lost_task_does_not_block_close():
+	service = SolverService(1, task_timeout=0.3)
+	results = list(LocalClient(service).solve([blocker('lost', 30.)]))
+	start = time.perf_counter()
+	service.close()
+	assert time.perf_counter() - start < 5
+	assert 'TimeoutError' in results[0]['error']
@@ -11,10 +11,10 @@ __maintainer__ = "Miguel Concha"
 __email__ = "mconcha@ciencias.unam.mx"
 __status__ = "Completo"
 
-import networkx as nx 			# Generación y manejo de gráficas con python.
 from random import randint		# Obtención de números aleatorios.
 from random import uniform
 from itertools import cycle     # Tratamiento de listas circulares.
+from colorsys import hsv_to_rgb # Generación de colores adicionales para el dibujo.
 
 def select_with_probability(l, p):
 	"""
@@ -60,6 +60,9 @@ def create_k_partite(maxi):
 	:return: Una gráfica k-partita de la biblioteca networkx.
 	:rtype: nx.Graph
 	"""
+	# Sólo aquí se necesita networkx; importarlo al cargar el módulo haría
+	# más lento el arranque del núcleo del algoritmo.
+	import networkx as nx
 	n = 1
 	k = 3
 	# Quiero repartir uniformemente la misma cantidad de vértices en cada partición.
@@ -77,27 +80,27 @@ def create_k_partite(maxi):
 	else:
 		return nx.turan_graph(n, k), k
 
+# Los primeros colores tienen nombre; a partir de ahí se generan.
+_NAMED_COLORS = ['red', 'blue', 'yellow', 'green', 'purple',
+                 'grey', 'orange', 'pink', 'magenta', 'brown']
+
 def color_map(color_int):
 	"""
 	Función que mapea enteros a cadenas que representan colores. Será útil
 	al momento de querer dibujar una gráfica cuyos vértices se coloreen
-	con matplotplib. Sabemos que 5 <= k <= 10, así que en el peor caso
-	se usan diez colores que hay que definir.
+	con matplotplib. Los primeros diez colores tienen nombre; para los
+	siguientes se genera un color hexadecimal recorriendo el matiz con la
+	razón áurea, de modo que colores consecutivos quedan bien separados.
 
-	:param color_int: El código de color a ser transformado.
+	:param color_int: El código de color a ser transformado (comienza en 1).
 	:return: La cadena que corresponde a dicho entero.
 	:rtype: string.
 	"""
-	if color_int == 1: return 'red'
-	if color_int == 2: return 'blue'
-	if color_int == 3: return 'yellow'
-	if color_int == 4: return 'green'
-	if color_int == 5: return 'purple'
-	if color_int == 6: return 'grey'
-	if color_int == 7: return 'orange'
-	if color_int == 8: return 'pink'
-	if color_int == 9: return 'magenta'
-	if color_int == 10: return 'brown'
+	if 1 <= color_int <= len(_NAMED_COLORS):
+		return _NAMED_COLORS[color_int - 1]
+	hue = (color_int * 0.618033988749895) % 1
+	r, g, b = hsv_to_rgb(hue, 0.65, 0.9)
+	return '#%02x%02x%02x' % (int(r * 255), int(g * 255), int(b * 255))
 
 class ColorClass:
 	"""
@@ -175,7 +178,7 @@ def clear_colors(G):
 	:param G: networkx.Graph
 	"""
 	for v in G.nodes:
-		G.node[v]['color'] = None
+		G.nodes[v]['color'] = None
 
 def color_vertex(G, v, c):
 	"""
@@ -185,7 +188,7 @@ def color_vertex(G, v, c):
 	:param v: La etiqueta entera del vértice a ser coloreado.
 	:param c: La etiqueta entera del color se le será asociado.
 	"""
-	G.node[v]['color'] = c
+	G.nodes[v]['color'] = c
 
 def no_conflict_adjacent(G, c, v2):
 	"""
@@ -200,7 +203,7 @@ def no_conflict_adjacent(G, c, v2):
     :return: Verdadero si tendrían colores distintos; falso en el caso contrario.
     :rtype: boolean.
 	"""
-	return G.node[v2]['color'] != c
+	return G.nodes[v2]['color'] != c
 
 def count_conlicts_vertex(G, v):
 	"""
@@ -213,11 +216,11 @@ def count_conlicts_vertex(G, v):
 	:rtype: int.
 	"""
 	conflicts = 0
-	my_color = G.node[v]['color']
+	my_color = G.nodes[v]['color']
 	# Por cada uno de sus vecinos, si coincide con su color, incrementamos
 	# el contador de conflictos.
 	for neighbor in list(G.adj[v]):
-		if my_color == G.node[neighbor]['color']:
+		if my_color == G.nodes[neighbor]['color']:
 			conflicts += 1
 	return conflicts
 
@@ -240,6 +243,21 @@ def count_global_conflicts(G):
 	# El resultado lo dividimos entre dos pues las aristas son no dirigidas.
 	return global_conflicts // 2
 
+def count_colors(G):
+	"""
+	Función que determina el número de colores distintos que se usaron
+	para colorear los vértices de G (los vértices sin color no cuentan).
+
+	:param G: networkx.Graph
+	:return: El número de colores distintos en la gráfica.
+	:rtype: int.
+	"""
+	colors = set()
+	for vertex in G.nodes:
+		if G.nodes[vertex]['color'] != None:
+			colors.add(G.nodes[vertex]['color'])
+	return len(colors)
+
 def W(G, C_k):
 	"""
 	Devuelve la lista de vértices de G(V) que pueden 
@@ -258,7 +276,7 @@ def W(G, C_k):
 	"""
 	W = []
 	for vertex in G.nodes:
-		if G.node[vertex]['color'] == None:
+		if G.nodes[vertex]['color'] == None:
 			if vertex not in C_k.vertices:
 				# Comprobando que el vértice no sea adyacente a uno 
 				# de la clase de color.
@@ -285,7 +303,7 @@ def B(G, C_k):
 	"""
 	B = []
 	for vertex in G.nodes:
-		if G.node[vertex]['color'] == None:
+		if G.nodes[vertex]['color'] == None:
 			# Si no tiene color, no lo podríamos meter a la clase
 			# de color y lo consideramos.
 			if vertex in C_k.vertices:
@@ -399,7 +417,7 @@ def test(G, mini):
 			# Lo agregamos a la de vértices de la clase de color que le tocó.
 			list_color_classes[which_color_class].vertices.append(node)
 			# Coloreando el vértice.
-			G.node[node]['color'] = which_color_class
+			G.nodes[node]['color'] = which_color_class
 		# Calculando el número de colores que usamos.
 		total_used = non_empty(list_color_classes)
 	return list_color_classes, total_used